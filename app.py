@@ -1,105 +1,146 @@
 # app.py
 import streamlit as st
-import pdfplumber
+import pypdfium2 as pdfium
 import re
-from typing import Dict, List
+import io
+import string
+import threading
+from typing import BinaryIO, Dict, List
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extracts raw text from a PDF file."""
-    text = ""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-    except Exception as e:
-        st.error(f"Error reading PDF: {str(e)}")
-        return ""
-    return text
+# PDFium is not thread-safe and Streamlit runs each session in its own thread,
+# so all PDFium calls are serialized through this lock
+_PDFIUM_LOCK = threading.Lock()
 
-def extract_key_info(text: str) -> Dict:
-    """Extracts key data using regex tailored to the research report."""
-    info = {}
-    
+# Distinct uploads kept in each content-keyed cache
+_CACHE_MAX_ENTRIES = 32
+
+# ASCII-only lowercasing, used when str.lower() would change the text length
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# All patterns below are lowercase and run against lowercased text,
+# which keeps the automata free of case-folding branches
+
+# Key info patterns, fused so the text is scanned once; each value is a named group
+_KEY_INFO_RE = re.compile(
     # Price Target
-    info["price_target"] = re.search(r"Target[:\s]*INR(\d+)", text, re.IGNORECASE)
-    
+    r"target[:\s]*inr(?P<price_target>\d+)"
     # Recommendation
-    info["recommendation"] = re.search(r"Rating[:\s]*(BUY|SELL|HOLD)", text, re.IGNORECASE)
-    
+    r"|rating[:\s]*(?P<recommendation>buy|sell|hold)"
     # Revenue (latest year, e.g., FY27E)
-    revenue_match = re.search(r"Revenue \(INR cr\)\s*[\d\s-]+\s(\d+)", text, re.IGNORECASE)
-    info["revenue"] = revenue_match if revenue_match else None
-    
+    r"|revenue \(inr cr\)\s*[\d\s-]+\s(?P<revenue>\d+)"
     # Net Income (latest year, e.g., FY27E)
-    net_income_match = re.search(r"Net profit \(INR cr\)\s*-?[\d\s-]+\s(-?\d+)", text, re.IGNORECASE)
-    info["net_income"] = net_income_match if net_income_match else None
-    
+    r"|net profit \(inr cr\)\s*-?[\d\s-]+\s(?P<net_income>-?\d+)"
     # EPS (if present, fallback)
-    info["eps"] = re.search(r"Earnings Per Share[:\s]*INR?(\d+\.?\d*)", text, re.IGNORECASE)
-    
-    # Clean up extracted values
-    for key, match in info.items():
-        if match:
-            info[key] = match.group(1)
-        else:
-            info[key] = "Not Found"
-    
+    r"|earnings per share[:\s]*inr?(?P<eps>\d+\.?\d*)"
+)
+
+# Growth trigger phrases; the other pros/cons triggers are plain substrings
+_GROWTH_RE = re.compile(r"strong growth|healthy store economics|valuation re-rating|aggressive growth")
+
+# Valuation metrics (latest year)
+_VALUATION_PATTERNS = {
+    # EV/EBITDA
+    "ev_ebitda": ("ev/ebitda", re.compile(r"ev/ebitda\s*\(x\)\s*[\d\.\s-]+\s(\d+\.\d+)")),
+    # P/E Ratio (latest year)
+    "pe_ratio": ("p/e ratio", re.compile(r"p/e ratio\s*\(x\)\s*[\d\.\s-]+\s(\d+\.\d+)")),
+    # RoCE (latest year)
+    "roce": ("roace", re.compile(r"roace\s*\(%\)\s*[\d\.\s-]+\s(\d+\.\d+)")),
+}
+
+def extract_text_from_pdf(pdf_src: BinaryIO) -> str:
+    """Extracts raw text from a PDF file object."""
+    try:
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(pdf_src)
+            try:
+                return "".join(page.get_textpage().get_text_bounded() for page in pdf)
+            finally:
+                pdf.close()
+    except Exception as e:
+        st.error(f"Error reading PDF: {str(e)}")
+        return ""
+
+def _lower_for_search(text: str) -> str:
+    """Lowercases text while keeping offsets aligned with the original."""
+    lowered = text.lower()
+    # A few characters (e.g. "İ") lowercase to two; fall back so slicing stays valid
+    if len(lowered) != len(text):
+        lowered = text.translate(_ASCII_LOWER)
+    return lowered
+
+def _search_from_literal(lowered: str, literal: str, pattern: re.Pattern):
+    """Runs a pattern only if its leading literal occurs, starting from the first hit."""
+    start = lowered.find(literal)
+    return pattern.search(lowered, start) if start >= 0 else None
+
+def extract_key_info(text: str, lowered: str) -> Dict:
+    """Extracts key data using regex tailored to the research report."""
+    info = dict.fromkeys(_KEY_INFO_RE.groupindex, "Not Found")
+    found = set()
+    for match in _KEY_INFO_RE.finditer(lowered):
+        # Keep the first match per key, as a separate search would
+        if match.lastgroup not in found:
+            found.add(match.lastgroup)
+            # Slice the original text so values keep the report's casing
+            start, end = match.span(match.lastgroup)
+            info[match.lastgroup] = text[start:end]
+            if len(found) == len(info):
+                break
     return info
 
-def extract_pros_and_cons(text: str) -> Dict:
+def extract_pros_and_cons(lowered: str, info: Dict) -> Dict:
     """Extracts pros and cons based on keywords and context."""
     pros = []
     cons = []
     
     # Pros (positive indicators)
-    if re.search(r"strong growth|healthy store economics|valuation re-rating|aggressive growth", text, re.IGNORECASE):
+    if _GROWTH_RE.search(lowered):
         pros.append("Strong growth potential and healthy store economics")
-    if re.search(r"internal accruals", text, re.IGNORECASE):
+    if "internal accruals" in lowered:
         pros.append("Self-funded expansion through internal accruals")
-    if re.search(r"BUY", text, re.IGNORECASE):
+    if "buy" in lowered:
         pros.append("Positive analyst recommendation (BUY)")
     
     # Cons (risks or negatives)
-    if re.search(r"intense competition", text, re.IGNORECASE):
+    if "intense competition" in lowered:
         cons.append("Intense competition in the value retail space")
-    if re.search(r"store closure", text, re.IGNORECASE):
+    if "store closure" in lowered:
         cons.append("Risk of store closures (historical rate <2%)")
-    if "Not Found" in extract_key_info(text).values():
+    if "Not Found" in info.values():
         cons.append("Incomplete financial data in report")
     
     return {"pros": pros if pros else ["No specific pros identified"], "cons": cons if cons else ["No specific cons identified"]}
 
-def extract_valuations(text: str) -> Dict:
+def extract_valuations(lowered: str) -> Dict:
     """Extracts valuation metrics from the report."""
     valuations = {}
-    
-    # EV/EBITDA
-    ev_ebitda = re.search(r"EV/EBITDA\s*\(x\)\s*[\d\.\s-]+\s(\d+\.\d+)", text, re.IGNORECASE)
-    valuations["ev_ebitda"] = ev_ebitda.group(1) if ev_ebitda else "Not Found"
-    
-    # P/E Ratio (latest year)
-    pe_ratio = re.search(r"P/E ratio\s*\(x\)\s*[\d\.\s-]+\s(\d+\.\d+)", text, re.IGNORECASE)
-    valuations["pe_ratio"] = pe_ratio.group(1) if pe_ratio else "Not Found"
-    
-    # RoCE (latest year)
-    roce = re.search(r"RoACE\s*\(%\)\s*[\d\.\s-]+\s(\d+\.\d+)", text, re.IGNORECASE)
-    valuations["roce"] = roce.group(1) if roce else "Not Found"
-    
+    for key, (literal, pattern) in _VALUATION_PATTERNS.items():
+        match = _search_from_literal(lowered, literal, pattern)
+        valuations[key] = match.group(1) if match else "Not Found"
     return valuations
 
-def analyze_research_report(pdf_path: str) -> Dict:
-    """Analyzes a research report PDF and returns key info, pros/cons, and valuations."""
-    text = extract_text_from_pdf(pdf_path)
-    info = extract_key_info(text)
-    pros_cons = extract_pros_and_cons(text)
-    valuations = extract_valuations(text)
+def analyze_report_text(text: str) -> Dict:
+    """Analyzes extracted report text and returns key info, pros/cons, and valuations."""
+    lowered = _lower_for_search(text)
+    info = extract_key_info(text, lowered)
+    pros_cons = extract_pros_and_cons(lowered, info)
+    valuations = extract_valuations(lowered)
     return {
         "key_info": info,
         "pros_cons": pros_cons,
-        "valuations": valuations,
-        "raw_text": text  # For debugging
+        "valuations": valuations
     }
 
+@st.cache_data(show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
+    """Extracts raw text from PDF bytes; cached on content so each upload is parsed once."""
+    return extract_text_from_pdf(io.BytesIO(pdf_bytes))
+
+@st.cache_data(show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def analyze_pdf_bytes(pdf_bytes: bytes) -> Dict:
+    """Analyzes raw PDF bytes; cached on content so re-uploading the same report is instant."""
+    return analyze_report_text(extract_text_from_pdf_bytes(pdf_bytes))
+
 # Streamlit app
 st.title("Research Report Analyzer (Basic)")
 st.write("Upload a research report PDF to extract key details, pros/cons, and valuations.")
@@ -107,21 +148,17 @@ st.write("Upload a research report PDF to extract key details, pros/cons, and va
 uploaded_file = st.file_uploader("Choose a PDF file", type="pdf")
 
 if uploaded_file is not None:
-    try:
-        with open("temp.pdf", "wb") as f:
-            f.write(uploaded_file.getbuffer())
-    except Exception as e:
-        st.error(f"Error saving PDF: {str(e)}")
-    else:
-        with st.spinner("Extracting details..."):
-            results = analyze_research_report("temp.pdf")
-        
-        st.subheader("Extracted Details")
-        st.write("**Key Information:**", results["key_info"])
-        st.subheader("Pros and Cons")
-        st.write("**Pros:**", results["pros_cons"]["pros"])
-        st.write("**Cons:**", results["pros_cons"]["cons"])
-        st.subheader("Valuations")
-        st.write("**Valuation Metrics:**", results["valuations"])
-        st.subheader("Raw Extracted Text (for debugging)")
-        st.text_area("Raw Text", results["raw_text"], height=200)
\ No newline at end of file
+    pdf_bytes = uploaded_file.getvalue()
+    with st.spinner("Extracting details..."):
+        results = analyze_pdf_bytes(pdf_bytes)
+    
+    st.subheader("Extracted Details")
+    st.write("**Key Information:**", results["key_info"])
+    st.subheader("Pros and Cons")
+    st.write("**Pros:**", results["pros_cons"]["pros"])
+    st.write("**Cons:**", results["pros_cons"]["cons"])
+    st.subheader("Valuations")
+    st.write("**Valuation Metrics:**", results["valuations"])
+    st.subheader("Raw Extracted Text (for debugging)")
+    if st.checkbox("Show raw text"):
+        st.text_area("Raw Text", extract_text_from_pdf_bytes(pdf_bytes), height=200)
\ No newline at end of file